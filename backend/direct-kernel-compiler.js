@@ -3,9 +3,20 @@ const path = require('path');
 const { spawn, exec } = require('child_process');
 const { promisify } = require('util');
 const crypto = require('crypto');
+const { performance } = require('perf_hooks');
 
 const execAsync = promisify(exec);
 
+// Per-file build/copy diagnostics - off unless explicitly enabled
+const KERNELQ_DEBUG = process.env.KERNELQ_DEBUG === 'true';
+const debugLog = (...args) => {
+    if (KERNELQ_DEBUG) console.log(...args);
+};
+
+// Don't compile or boot QEMU when less than this is left before the caller's deadline.
+// Exported so the validator's pre-compile check uses the same threshold.
+const MIN_BUDGET_MS = Number(process.env.KERNELQ_MIN_BUDGET_MS) || 5000;
+
 /**
  * Direct Kernel Module Compiler
  * Based on the interactive script but adapted for API usage
@@ -240,7 +251,7 @@ help:
                     path.join(sessionDir, koFile),
                     path.join(initramfsDir, 'lib/modules', koFile)
                 );
-                console.log(`  ✅ Copied: ${koFile}`);
+                debugLog(`  ✅ Copied: ${koFile}`);
             }
         } catch (error) {
             console.error('❌ Failed to copy kernel modules:', error.message);
@@ -256,7 +267,7 @@ help:
                         path.join(sessionDir, file),
                         path.join(initramfsDir, 'lib/modules', file)
                     );
-                    console.log(`📄 Copied header file: ${file}`);
+                    debugLog(`📄 Copied header file: ${file}`);
                 }
             }
         } catch (error) {
@@ -295,7 +306,7 @@ help:
                     // This prevents command injection via app.name or flags
                     const gccArgs = [...compileFlags, '-o', outputPath, appSrcPath];
 
-                    console.log(`🔨 Compiling ${safeAppName}...`);
+                    debugLog(`🔨 Compiling ${safeAppName}...`);
                     await new Promise((resolve, reject) => {
                         const proc = spawn('gcc', gccArgs, { stdio: ['pipe', 'pipe', 'pipe'] });
                         let stderr = '';
@@ -308,7 +319,7 @@ help:
                     });
 
                     await fs.chmod(outputPath, 0o755);
-                    console.log(`✅ Compiled ${safeAppName} successfully`);
+                    debugLog(`✅ Compiled ${safeAppName} successfully`);
                 } catch (error) {
                     console.error(`❌ Failed to compile ${app.name}:`, error.message);
                     throw new Error(`Userspace app compilation failed: ${app.name}`);
@@ -490,8 +501,8 @@ poweroff -f
                 const tccPath = '/home/zerohexer/.local/bin/tcc';
                 await this.copyFile(tccPath, path.join(initramfsDir, 'usr/bin/tcc'));
                 await fs.chmod(path.join(initramfsDir, 'usr/bin/tcc'), 0o755);
-                console.log(`✅ Copied TCC (345KB self-contained binary) - ultra fast!`);
-                console.log('🎉 TCC-only environment setup completed (~20x faster than GCC)');
+                debugLog(`✅ Copied TCC (345KB self-contained binary) - ultra fast!`);
+                debugLog('🎉 TCC-only environment setup completed (~20x faster than GCC)');
             } catch (error) {
                 console.warn('⚠️  TCC setup failed, continuing without development tools:', error.message);
             }
@@ -533,10 +544,10 @@ poweroff -f
             try {
                 await fs.access(makefilePath);
                 makefileExists = true;
-                console.log('📋 Using provided Makefile');
+                debugLog('📋 Using provided Makefile');
             } catch (error) {
                 // Makefile doesn't exist, we'll generate one
-                console.log('📋 Generating default Makefile');
+                debugLog('📋 Generating default Makefile');
             }
             
             // Generate Makefile only if it doesn't exist
@@ -636,7 +647,20 @@ poweroff -f
     }
 
     // Test module in QEMU with enhanced kernel_project_test support
-    async testModuleInQEMU(sessionDir, moduleName, testScenario = null) {
+    // options.onOutput(text) receives console output as it arrives; options.deadline (performance.now() ms)
+    // caps the QEMU run so it never outlives the caller's request
+    async testModuleInQEMU(sessionDir, moduleName, testScenario = null, options = {}) {
+        const { onOutput, deadline } = options;
+
+        if (deadline && deadline - performance.now() < MIN_BUDGET_MS) {
+            console.log('⏭️ Skipping QEMU test - request deadline too close');
+            return {
+                success: false,
+                error: 'Request deadline reached before QEMU test could run',
+                output: ''
+            };
+        }
+
         return new Promise(async (resolve) => {
             try {
                 // Create initramfs with testScenario support
@@ -706,7 +730,10 @@ poweroff -f
                         });
 
                         // Set a hard timeout to kill QEMU if it hangs (configurable via testScenario)
-                        const timeoutMs = (testScenario?.timeout || 15) * 1000; // Default 15 seconds
+                        let timeoutMs = (testScenario?.timeout || 15) * 1000; // Default 15 seconds
+                        if (deadline) {
+                            timeoutMs = Math.max(0, Math.min(timeoutMs, deadline - performance.now()));
+                        }
                         const killTimer = setTimeout(() => {
                             console.log(`🔪 Killing hanging QEMU process after ${timeoutMs/1000}s timeout...`);
                             qemu.kill('SIGKILL');
@@ -718,6 +745,7 @@ poweroff -f
                         qemu.stdout.on('data', (data) => {
                             const text = data.toString();
                             qemuOutput += text;
+                            if (onOutput) onOutput(text);
                             
                             // Extract dmesg-like output
                             if (text.includes('[') && text.includes(']')) {
@@ -726,7 +754,9 @@ poweroff -f
                         });
 
                         qemu.stderr.on('data', (data) => {
-                            qemuOutput += data.toString();
+                            const text = data.toString();
+                            qemuOutput += text;
+                            if (onOutput) onOutput(text);
                         });
 
                         qemu.on('close', (qemuCode) => {
@@ -831,7 +861,7 @@ poweroff -f
 
     // Main compilation method with kernel_project_test support
     // Supports both legacy single-file format and new multi-file format
-    async compileKernelModule(codeOrFiles, moduleName, testScenario = null) {
+    async compileKernelModule(codeOrFiles, moduleName, testScenario = null, options = {}) {
         // Check prerequisites
         const headerCheck = await this.checkKernelHeaders();
         if (!headerCheck.available) {
@@ -904,7 +934,7 @@ poweroff -f
                 if (testScenario?.makefile) {
                     const makefilePath = path.join(sessionDir, 'Makefile');
                     await fs.writeFile(makefilePath, testScenario.makefile);
-                    console.log(`🔒 Security: Using Makefile from test definition`);
+                    debugLog(`🔒 Security: Using Makefile from test definition`);
                 }
 
                 // Run style check on all C files
@@ -940,7 +970,7 @@ poweroff -f
             }
 
             // TEMPORARY: Test KERN_INFO vs KERN_ERR theory - run QEMU for all problems
-            const testResult = await this.testModuleInQEMU(sessionDir, moduleName, testScenario);
+            const testResult = await this.testModuleInQEMU(sessionDir, moduleName, testScenario, options);
 
             // Clean up after delay
             setTimeout(async () => {
@@ -978,3 +1008,4 @@ poweroff -f
 }
 
 module.exports = DirectKernelCompiler;
+module.exports.MIN_BUDGET_MS = MIN_BUDGET_MS;
@@ -5,16 +5,61 @@ const fs = require('fs').promises;
 const path = require('path');
 const { spawn, exec } = require('child_process');
 const { promisify } = require('util');
+const crypto = require('crypto');
+const { performance } = require('perf_hooks');
 const DirectKernelCompiler = require('./direct-kernel-compiler');
+const { MIN_BUDGET_MS } = DirectKernelCompiler;
 const generatedTestDefinitions = require('./generated-test-definitions');
 
 const execAsync = promisify(exec);
 
+// Verdicts that depend only on the submitted source, safe to reuse for identical resubmissions.
+// COMPILATION_ERROR is left out: it also covers host failures (missing headers, spawn/write errors).
+const CACHEABLE_RESULTS = new Set(['ACCEPTED', 'PRE_COMPILATION_ERROR']);
+const RESULT_CACHE_TTL = 10 * 60 * 1000;
+const RESULT_CACHE_SIZE = 64;
+
+// How much later than an in-flight run's deadline a joining caller's deadline may be.
+// Absorbs the latency jitter between a client's first attempt and its retry.
+const DEADLINE_JOIN_SLACK_MS = 1000;
+
+// Test definitions are static, so each pattern string is compiled once and reused.
+// None of these use the g flag, so sharing them across validations is stateless.
+const compiledPatterns = new Map();
+const compilePattern = (source, flags = '') => {
+    const key = `${flags}/${source}`;
+    let regex = compiledPatterns.get(key);
+    if (!regex) {
+        regex = new RegExp(source, flags);
+        compiledPatterns.set(key, regex);
+    }
+    return regex;
+};
+
+const CHECKPATCH_LINE = /^(WARNING|ERROR|CHECK):\s*(.*)/;
+
+// Forbidden patterns in kernel code
+const FORBIDDEN_PATTERNS = [
+    { pattern: /\bprintf\s*\(/, message: 'Use printk() instead of printf() in kernel code' },
+    { pattern: /\bmalloc\s*\(/, message: 'Use kmalloc() instead of malloc() in kernel code' },
+    { pattern: /\bfree\s*\(/, message: 'Use kfree() instead of free() in kernel code' },
+    { pattern: /#include\s*<stdio\.h>/, message: 'Remove stdio.h - not available in kernel space' },
+    { pattern: /system\s*\(/, message: 'system() calls are forbidden in kernel code' },
+    { pattern: /exec\w*\s*\(/, message: 'exec() calls are forbidden in kernel code' },
+    // 🔒 SECURITY: Block absolute path includes to prevent info disclosure via GCC errors
+    // e.g., #include "/etc/passwd" could leak file contents in error messages
+    { pattern: /#include\s*["<]\//, message: 'Absolute path includes are forbidden - use relative paths only' },
+    // 🔒 SECURITY: Block path traversal in includes
+    { pattern: /#include\s*["<]\.\./, message: 'Path traversal in includes is forbidden' }
+];
+
 class LeetCodeStyleValidator {
     constructor(workingDirectory = './work') {
         this.workingDirectory = workingDirectory;
         this.timeout = 30000;
         this.directCompiler = new DirectKernelCompiler(workingDirectory);
+        this.resultCache = new Map();
+        this.pendingValidations = new Map();
         this.initializeTestDefinitions();
     }
 
@@ -27,10 +72,9 @@ class LeetCodeStyleValidator {
     parseCheckpatchOutput(rawOutput) {
         const lines = rawOutput.split('\n');
         const feedback = [];
-        const regex = /^(WARNING|ERROR|CHECK):\s*(.*)/;
 
         for (const line of lines) {
-            const match = line.match(regex);
+            const match = line.match(CHECKPATCH_LINE);
             if (match) {
                 feedback.push({
                     type: match[1].toLowerCase(), // 'warning', 'error', or 'check'
@@ -59,7 +103,62 @@ class LeetCodeStyleValidator {
 
     // Main validation function - LeetCode style
     // Supports both legacy single-file and new multi-file formats
-    async validateSolution(codeOrFiles, problemId, moduleName) {
+    // options.onOutput(text) receives QEMU console output as it arrives (not for cached or joined runs)
+    // options.deadline (performance.now() ms) is when the caller stops waiting; QEMU is cut off by then
+    async validateSolution(codeOrFiles, problemId, moduleName, options = {}) {
+        // Identical resubmissions reuse a recent deterministic verdict instead of booting QEMU again.
+        // The key includes moduleName, which the frontend stamps with Date.now(), so only callers that
+        // resubmit under a fixed module name (scripts, batch jobs) ever hit this cache.
+        const cacheKey = crypto.createHash('sha256')
+            .update(JSON.stringify([codeOrFiles, String(problemId), moduleName]))
+            .digest('hex');
+        const cached = this.resultCache.get(cacheKey);
+
+        if (cached && performance.now() - cached.timestamp < RESULT_CACHE_TTL) {
+            console.log(`♻️ Reusing cached validation result for problem: ${problemId}`);
+            return cached.results;
+        }
+        this.resultCache.delete(cacheKey);
+
+        // A submission identical in source, problem and module name to one still running shares that run.
+        // The frontend stamps moduleName with Date.now(), so in practice this is a retry of the same request.
+        // Only join when that run's deadline is not meaningfully earlier than ours; a run cut short for
+        // another client's tighter budget would be the wrong answer for this one, so start a fresh run.
+        // Both deadlines are arrival time plus the client's remaining budget, so a retry's lands a little
+        // after the first attempt's by however much slower it reached us - DEADLINE_JOIN_SLACK_MS covers that.
+        const deadline = options.deadline || Infinity;
+        const pending = this.pendingValidations.get(cacheKey);
+        if (pending && deadline <= pending.deadline + DEADLINE_JOIN_SLACK_MS) {
+            console.log(`♻️ Joining in-flight validation for problem: ${problemId}`);
+            return pending.run;
+        }
+
+        const run = this.runValidation(codeOrFiles, problemId, moduleName, options);
+        const entry = { run, deadline };
+        this.pendingValidations.set(cacheKey, entry);
+
+        let results;
+        try {
+            results = await run;
+        } finally {
+            // A later-deadline run may have replaced this entry meanwhile; leave that one in place
+            if (this.pendingValidations.get(cacheKey) === entry) {
+                this.pendingValidations.delete(cacheKey);
+            }
+        }
+
+        if (CACHEABLE_RESULTS.has(results.overallResult)) {
+            // Map keeps insertion order, so the first key is the oldest entry
+            if (this.resultCache.size >= RESULT_CACHE_SIZE) {
+                this.resultCache.delete(this.resultCache.keys().next().value);
+            }
+            this.resultCache.set(cacheKey, { results, timestamp: performance.now() });
+        }
+
+        return results;
+    }
+
+    async runValidation(codeOrFiles, problemId, moduleName, options = {}) {
         const sessionId = this.generateSessionId();
         const results = {
             sessionId,
@@ -73,9 +172,14 @@ class LeetCodeStyleValidator {
             feedback: []
         };
 
-        const startTime = Date.now();
+        const startTime = performance.now();
 
         try {
+            // Step 0: Bail out before compiling if the caller is about to give up anyway
+            if (options.deadline && options.deadline - performance.now() < MIN_BUDGET_MS) {
+                throw new Error('Request deadline reached before validation could start');
+            }
+
             // Step 1: Get test definition
             const testDef = this.testDefinitions.get(problemId) || 
                            this.testDefinitions.get(parseInt(problemId)) ||
@@ -106,7 +210,7 @@ class LeetCodeStyleValidator {
                 testScenario.makefile = testDef.makefile;
             }
 
-            const compilation = await this.compileModule(codeOrFiles, moduleName, sessionId, testScenario);
+            const compilation = await this.compileModule(codeOrFiles, moduleName, sessionId, testScenario, options);
             results.compilationResult = compilation;
             
             if (!compilation.success) {
@@ -120,8 +224,9 @@ class LeetCodeStyleValidator {
             }
 
             // Step 3.5: Process style check results from checkpatch.pl
-            if (compilation.directResults?.styleCheck?.output) {
-                const styleFeedback = this.parseCheckpatchOutput(compilation.directResults.styleCheck.output);
+            const styleOutput = compilation.directResults?.styleCheck?.output;
+            if (styleOutput) {
+                const styleFeedback = this.parseCheckpatchOutput(styleOutput);
                 if (styleFeedback.length > 0) {
                     // Add style feedback as non-critical information
                     results.feedback.push({
@@ -167,7 +272,7 @@ class LeetCodeStyleValidator {
             });
         } finally {
             await this.cleanup(sessionId);
-            results.executionTime = Date.now() - startTime;
+            results.executionTime = Math.round(performance.now() - startTime);
         }
 
         return results;
@@ -220,7 +325,7 @@ class LeetCodeStyleValidator {
         // Check exact function names
         if (requirements.functionNames) {
             for (const funcName of requirements.functionNames) {
-                const regex = new RegExp(`\\b${funcName}\\b`);
+                const regex = compilePattern(`\\b${funcName}\\b`);
                 const found = regex.test(code);
                 
                 results.tests.push({
@@ -249,8 +354,8 @@ class LeetCodeStyleValidator {
                 const escapedName = variable.name.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
                 // For array names, use word boundary before the name but not after (since ] is not a word char)
                 const regex = variable.name.includes('[') 
-                    ? new RegExp(`\\b${escapedName}`)
-                    : new RegExp(`\\b${escapedName}\\b`);
+                    ? compilePattern(`\\b${escapedName}`)
+                    : compilePattern(`\\b${escapedName}\\b`);
                 const found = regex.test(code);
                 
                 results.tests.push({
@@ -292,15 +397,20 @@ class LeetCodeStyleValidator {
         }
 
         // Extract output from compilation and testing
+        const { compilation, testing } = directResults;
         let output = '';
-        if (directResults.compilation) {
-            output += directResults.compilation.output || '';
+        if (compilation) {
+            output += compilation.output || '';
         }
-        if (directResults.testing) {
-            output += directResults.testing.output || '';
-            output += directResults.testing.dmesg || '';
+        if (testing) {
+            output += testing.output || '';
+            output += testing.dmesg || '';
         }
 
+        // Whether the module linked, scanned once for all compilation-based checks
+        const moduleBuilt = output.includes('LD [M]') && output.includes('.ko');
+        const codeString = this.extractCodeString(directResults.code || '');
+
         // Run each test case based on direct compilation output
         for (const testCase of testDef.testCases) {
             let testResult = {
@@ -311,24 +421,24 @@ class LeetCodeStyleValidator {
                 executionTime: 0
             };
 
-            const testStart = Date.now();
+            const testStart = performance.now();
 
             try {
                 switch (testCase.type) {
                     case 'symbol_check':
-                        testResult = this.analyzeDirectSymbols(output, testCase);
+                        testResult = this.analyzeDirectSymbols(output, testCase, moduleBuilt);
                         break;
                     case 'output_match':
                         testResult = this.analyzeDirectOutput(output, testCase);
                         break;
                     case 'structure_check':
-                        testResult = this.analyzeDirectStructure(output, testCase);
+                        testResult = this.analyzeDirectStructure(output, testCase, moduleBuilt);
                         break;
                     case 'code_analysis':
-                        testResult = this.analyzeCodeAnalysis(this.extractCodeString(directResults.code || ''), testCase);
+                        testResult = this.analyzeCodeAnalysis(codeString, testCase);
                         break;
                     case 'variable_check':
-                        testResult = this.analyzeVariableCheck(output, testCase);
+                        testResult = this.analyzeVariableCheck(output, testCase, moduleBuilt);
                         break;
                     case 'kernel_project_test':
                         testResult = await this.analyzeKernelProjectTest(directResults, testCase);
@@ -342,7 +452,7 @@ class LeetCodeStyleValidator {
                 testResult.message = `Test analysis failed: ${error.message}`;
             }
 
-            testResult.executionTime = Date.now() - testStart;
+            testResult.executionTime = Math.round(performance.now() - testStart);
             testResult.critical = testCase.critical || false; // Add critical flag
             results.tests.push(testResult);
         }
@@ -351,7 +461,7 @@ class LeetCodeStyleValidator {
     }
 
     // Analyze Direct compilation output for required symbols/functions
-    analyzeDirectSymbols(output, testCase) {
+    analyzeDirectSymbols(output, testCase, moduleBuilt) {
         const result = {
             id: testCase.id,
             name: testCase.name,
@@ -360,7 +470,7 @@ class LeetCodeStyleValidator {
         };
 
         // Check if compilation was successful (BTF generation and module creation)
-        if (output.includes('LD [M]') && output.includes('.ko')) {
+        if (moduleBuilt) {
             result.status = 'PASSED';
             result.message = 'Module compiled successfully - required symbols present';
         } else {
@@ -396,7 +506,7 @@ class LeetCodeStyleValidator {
         for (const expected of testCase.expected) {
             const pattern = expected.exact ? 
                 expected.pattern : 
-                new RegExp(expected.pattern, 'i');
+                compilePattern(expected.pattern, 'i');
             
             const found = expected.exact ? 
                 output.includes(expected.pattern) :
@@ -418,7 +528,7 @@ class LeetCodeStyleValidator {
     }
 
     // Analyze Direct compilation output for structure validation
-    analyzeDirectStructure(output, testCase) {
+    analyzeDirectStructure(output, testCase, moduleBuilt) {
         const result = {
             id: testCase.id,
             name: testCase.name,
@@ -427,7 +537,7 @@ class LeetCodeStyleValidator {
         };
 
         // If module compiled successfully, structure is likely correct
-        if (output.includes('LD [M]') && output.includes('.ko')) {
+        if (moduleBuilt) {
             result.status = 'PASSED';
             result.message = 'Module structure validated by successful compilation';
         } else {
@@ -486,7 +596,7 @@ class LeetCodeStyleValidator {
     }
 
     // Analyze variable declarations and usage
-    analyzeVariableCheck(output, testCase) {
+    analyzeVariableCheck(output, testCase, moduleBuilt) {
         const result = {
             id: testCase.id,
             name: testCase.name,
@@ -495,7 +605,7 @@ class LeetCodeStyleValidator {
         };
 
         // If module compiled successfully, variable checks likely passed
-        if (output.includes('LD [M]') && output.includes('.ko')) {
+        if (moduleBuilt) {
             result.status = 'PASSED';
             result.message = 'Variable validation passed by successful compilation';
         } else {
@@ -519,7 +629,7 @@ class LeetCodeStyleValidator {
                 executionTime: 0
             };
 
-            const testStart = Date.now();
+            const testStart = performance.now();
 
             try {
                 switch (testCase.type) {
@@ -544,7 +654,7 @@ class LeetCodeStyleValidator {
                 testResult.message = `Test execution failed: ${error.message}`;
             }
 
-            testResult.executionTime = Date.now() - testStart;
+            testResult.executionTime = Math.round(performance.now() - testStart);
             results.tests.push(testResult);
         }
 
@@ -604,7 +714,7 @@ class LeetCodeStyleValidator {
             for (const expected of testCase.expected) {
                 const pattern = expected.exact ? 
                     expected.pattern : 
-                    new RegExp(expected.pattern, 'i');
+                    compilePattern(expected.pattern, 'i');
                 
                 const found = expected.exact ? 
                     dmesgOutput.includes(expected.pattern) :
@@ -740,8 +850,9 @@ class LeetCodeStyleValidator {
         }
 
         // Add QEMU output to feedback for debugging
-        if (results.compilationResult && results.compilationResult.directResults) {
-            const qemuOutput = results.compilationResult.directResults.testing?.output || '';
+        const directResults = results.compilationResult?.directResults;
+        if (directResults) {
+            const qemuOutput = directResults.testing?.output || '';
             if (qemuOutput.length > 0) {
                 results.feedback.push({
                     type: 'qemu_output',
@@ -755,22 +866,7 @@ class LeetCodeStyleValidator {
     checkSecurity(code) {
         const issues = [];
 
-        // Forbidden patterns in kernel code
-        const forbidden = [
-            { pattern: /\bprintf\s*\(/, message: 'Use printk() instead of printf() in kernel code' },
-            { pattern: /\bmalloc\s*\(/, message: 'Use kmalloc() instead of malloc() in kernel code' },
-            { pattern: /\bfree\s*\(/, message: 'Use kfree() instead of free() in kernel code' },
-            { pattern: /#include\s*<stdio\.h>/, message: 'Remove stdio.h - not available in kernel space' },
-            { pattern: /system\s*\(/, message: 'system() calls are forbidden in kernel code' },
-            { pattern: /exec\w*\s*\(/, message: 'exec() calls are forbidden in kernel code' },
-            // 🔒 SECURITY: Block absolute path includes to prevent info disclosure via GCC errors
-            // e.g., #include "/etc/passwd" could leak file contents in error messages
-            { pattern: /#include\s*["<]\//, message: 'Absolute path includes are forbidden - use relative paths only' },
-            // 🔒 SECURITY: Block path traversal in includes
-            { pattern: /#include\s*["<]\.\./, message: 'Path traversal in includes is forbidden' }
-        ];
-
-        for (const check of forbidden) {
+        for (const check of FORBIDDEN_PATTERNS) {
             if (check.pattern.test(code)) {
                 issues.push(check.message);
             }
@@ -779,22 +875,23 @@ class LeetCodeStyleValidator {
         return issues;
     }
 
-    async compileModule(codeOrFiles, moduleName, sessionId, testScenario = null) {
+    async compileModule(codeOrFiles, moduleName, sessionId, testScenario = null, options = {}) {
         try {
             console.log(`🔨 Direct Compiling module: ${moduleName}`);
-            const result = await this.directCompiler.compileKernelModule(codeOrFiles, moduleName, testScenario);
+            const result = await this.directCompiler.compileKernelModule(codeOrFiles, moduleName, testScenario, options);
+            const combinedOutput = (result.compilation?.output || '') + (result.testing?.output || '');
             
             if (result.success) {
                 return {
                     success: true,
-                    output: (result.compilation?.output || '') + (result.testing?.output || ''),
+                    output: combinedOutput,
                     directResults: result
                 };
             } else {
                 return {
                     success: false,
                     error: result.error || 'Direct compilation/testing failed',
-                    output: result.output || (result.compilation?.output || '') + (result.testing?.output || ''),
+                    output: result.output || combinedOutput,
                     directResults: result
                 };
             }
@@ -841,7 +938,7 @@ class LeetCodeStyleValidator {
             // Check expected dmesg patterns
             if (expected.dmesg && expected.dmesg.length > 0) {
                 for (const pattern of expected.dmesg) {
-                    const regex = new RegExp(pattern, 'i');
+                    const regex = compilePattern(pattern, 'i');
                     if (!regex.test(qemuOutput)) {
                         allChecksPass = false;
                         failedChecks.push(`Missing dmesg pattern: "${pattern}"`);
@@ -854,7 +951,7 @@ class LeetCodeStyleValidator {
             // Check expected stdout patterns
             if (expected.stdout && expected.stdout.length > 0) {
                 for (const pattern of expected.stdout) {
-                    const regex = new RegExp(pattern, 'i');
+                    const regex = compilePattern(pattern, 'i');
                     if (!regex.test(qemuOutput)) {
                         allChecksPass = false;
                         failedChecks.push(`Missing stdout pattern: "${pattern}"`);
@@ -867,7 +964,7 @@ class LeetCodeStyleValidator {
             // Check expected stderr patterns
             if (expected.stderr && expected.stderr.length > 0) {
                 for (const pattern of expected.stderr) {
-                    const regex = new RegExp(pattern, 'i');
+                    const regex = compilePattern(pattern, 'i');
                     if (!regex.test(qemuOutput)) {
                         allChecksPass = false;
                         failedChecks.push(`Missing stderr pattern: "${pattern}"`);
@@ -1,6 +1,9 @@
 const express = require('express');
 const cors = require('cors');
 const cookieParser = require('cookie-parser');
+const fs = require('fs');
+const net = require('net');
+const { performance } = require('perf_hooks');
 const bcrypt = require('bcrypt'); // For password hashing
 const DirectKernelCompiler = require('./direct-kernel-compiler');
 const LeetCodeStyleValidator = require('./leetcode-style-validator');
@@ -18,6 +21,8 @@ const { initializeGoogleOAuth, googleAuthRoutes } = require('./middleware/google
 
 const app = express();
 const PORT = process.env.PORT || 3001;
+// Optional Unix-domain socket for local tools (e.g. /run/kernelq.sock), served alongside the TCP port
+const SOCKET_PATH = process.env.KERNELQ_SOCKET;
 
 // Trust proxy for Cloudflare/tunnels (fixes rate limiting behind proxy)
 app.set('trust proxy', true);
@@ -39,7 +44,7 @@ app.use(cors({
     ],
     credentials: true,
     methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-    allowedHeaders: ['Content-Type', 'Authorization', 'X-Requested-With']
+    allowedHeaders: ['Content-Type', 'Authorization', 'X-Requested-With', 'X-Request-Timeout']
 }));
 app.use(express.json({ limit: '10mb' }));
 app.use(cookieParser());
@@ -58,9 +63,27 @@ app.use((req, res, next) => {
     protectUserEndpoints(req, res, next);
 });
 
+// Turn the client's X-Request-Timeout (ms it will wait) into a deadline on the server's
+// monotonic clock. A relative budget avoids trusting the client's wall clock.
+const requestDeadline = (req) => {
+    const timeoutMs = Number(req.get('X-Request-Timeout'));
+    return Number.isFinite(timeoutMs) && timeoutMs > 0 ? performance.now() + timeoutMs : null;
+};
+
+// Compact result for callers that send summary: true and only need the verdict.
+// Drops the compiler/QEMU transcripts, which otherwise appear several times in the response.
+const summarizeValidation = ({ compilationResult, feedback, ...rest }) => ({
+    ...rest,
+    compilationResult: compilationResult && {
+        success: compilationResult.success,
+        error: compilationResult.error
+    },
+    feedback: (feedback || []).filter(f => f.type !== 'qemu_output')
+});
+
 // New comprehensive validation endpoint - LeetCode style with exact requirements
 app.post('/api/validate-solution-comprehensive', async (req, res) => {
-    const { code, files, moduleName, problemId } = req.body;
+    const { code, files, moduleName, problemId, summary } = req.body;
     
     // Support both legacy single-file and new multi-file formats
     const codeOrFiles = files || code;
@@ -73,29 +96,24 @@ app.post('/api/validate-solution-comprehensive', async (req, res) => {
     }
 
     try {
-        console.log(`🔍 Starting comprehensive validation for problem: ${problemId} (type: ${typeof problemId})`);
-        
-        if (Array.isArray(codeOrFiles)) {
-            console.log(`📁 Multi-file project with ${codeOrFiles.length} files`);
-        } else {
-            console.log(`📝 Single-file project with ${codeOrFiles.length} characters`);
-        }
-        
-        console.log(`🏗️ Module name: ${moduleName}`);
+        const projectInfo = Array.isArray(codeOrFiles)
+            ? `${codeOrFiles.length} files`
+            : `${codeOrFiles.length} characters`;
+        console.log(`🔍 Starting comprehensive validation for problem: ${problemId} (type: ${typeof problemId}), module: ${moduleName}, ${projectInfo}`);
         
         // Use the new comprehensive LeetCode-style validator
         const validationResults = await leetcodeValidator.validateSolution(
             codeOrFiles, 
             problemId, 
-            moduleName
+            moduleName,
+            { deadline: requestDeadline(req) }
         );
         
-        console.log(`✅ Validation completed with result: ${validationResults.overallResult}`);
-        console.log(`📊 Score: ${validationResults.score}, Tests: ${validationResults.testResults?.length || 0}`);
+        console.log(`✅ Validation completed with result: ${validationResults.overallResult}, score: ${validationResults.score}, tests: ${validationResults.testResults?.length || 0}`);
         
         res.json({
             success: true,
-            ...validationResults
+            ...(summary ? summarizeValidation(validationResults) : validationResults)
         });
 
     } catch (error) {
@@ -108,6 +126,137 @@ app.post('/api/validate-solution-comprehensive', async (req, res) => {
     }
 });
 
+// Streaming validation endpoint - Server-Sent Events with live QEMU output
+// Emits 'output' events while the module runs, then one 'done' event with the full result
+app.post('/api/validate-solution-stream', async (req, res) => {
+    const { code, files, moduleName, problemId, summary } = req.body;
+
+    // Support both legacy single-file and new multi-file formats
+    const codeOrFiles = files || code;
+
+    if (!codeOrFiles || !moduleName || !problemId) {
+        return res.status(400).json({
+            success: false,
+            error: 'Code/files, module name, and problem ID are required'
+        });
+    }
+
+    res.set({
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no'  // Tell proxies not to buffer the stream
+    });
+    res.flushHeaders();
+
+    // The run keeps going if the client disconnects; just stop writing to it
+    const sendEvent = (event, data) => {
+        if (!res.writableEnded && !res.destroyed) {
+            res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+        }
+    };
+
+    try {
+        console.log(`🔍 Starting streaming validation for problem: ${problemId}`);
+
+        const validationResults = await leetcodeValidator.validateSolution(
+            codeOrFiles,
+            problemId,
+            moduleName,
+            {
+                onOutput: (text) => sendEvent('output', text),
+                deadline: requestDeadline(req)
+            }
+        );
+
+        console.log(`✅ Streaming validation completed with result: ${validationResults.overallResult}`);
+
+        sendEvent('done', {
+            success: true,
+            ...(summary ? summarizeValidation(validationResults) : validationResults)
+        });
+    } catch (error) {
+        console.error('Streaming validation error:', error);
+        sendEvent('done', {
+            success: false,
+            error: error.message,
+            stage: 'comprehensive_validation'
+        });
+    }
+
+    res.end();
+});
+
+// Batch validation endpoint - runs several submissions concurrently, results in request order
+// problemId/moduleName at the top level apply to every job that does not set its own;
+// summary applies to the whole batch
+const MAX_BATCH_JOBS = 4;
+
+app.post('/api/validate-solution-batch', async (req, res) => {
+    const { problemId: defaultProblemId, moduleName: defaultModuleName, summary } = req.body;
+    const jobs = Array.isArray(req.body.jobs)
+        ? req.body.jobs.map(job => job && {
+            ...job,
+            problemId: job.problemId || defaultProblemId,
+            moduleName: job.moduleName || defaultModuleName
+        })
+        : req.body.jobs;
+
+    if (!Array.isArray(jobs) || jobs.length === 0 || jobs.length > MAX_BATCH_JOBS) {
+        return res.status(400).json({
+            success: false,
+            error: `jobs must be an array of 1-${MAX_BATCH_JOBS} submissions`
+        });
+    }
+
+    const invalid = jobs.findIndex(job => !job || !(job.files || job.code) || !job.moduleName || !job.problemId);
+    if (invalid !== -1) {
+        return res.status(400).json({
+            success: false,
+            error: `Job ${invalid}: code/files, module name, and problem ID are required`
+        });
+    }
+
+    try {
+        console.log(`🔍 Starting batch validation of ${jobs.length} submissions`);
+
+        // Each run gets its own session directory and QEMU instance, so they can overlap
+        const deadline = requestDeadline(req);
+        const results = await Promise.all(jobs.map(async ({ id, code, files, moduleName, problemId }) => {
+            try {
+                const validationResults = await leetcodeValidator.validateSolution(
+                    files || code,
+                    problemId,
+                    moduleName,
+                    { deadline }
+                );
+                return {
+                    id,
+                    success: true,
+                    ...(summary ? summarizeValidation(validationResults) : validationResults)
+                };
+            } catch (error) {
+                return { id, success: false, error: error.message, stage: 'comprehensive_validation' };
+            }
+        }));
+
+        console.log(`✅ Batch validation completed: ${results.map(r => r.overallResult || 'ERROR').join(', ')}`);
+
+        res.json({
+            success: true,
+            results
+        });
+
+    } catch (error) {
+        console.error('Batch validation error:', error);
+        res.status(500).json({
+            success: false,
+            error: error.message,
+            stage: 'batch_validation'
+        });
+    }
+});
+
 // Real kernel module compilation endpoint using direct compilation
 app.post('/api/compile-kernel-module', async (req, res) => {
     const { code, files, moduleName, problemId } = req.body;
@@ -689,6 +838,17 @@ app.post('/api/admin/database/backup', authenticateJWT, async (req, res) => {
 });
 
 // Start server
+// A socket file nobody is accepting on (ECONNREFUSED) was left behind by a dead process.
+// Any other outcome - a successful connect, or an error we can't interpret - leaves it alone.
+const isStaleSocket = (socketPath) => new Promise((resolve) => {
+    const probe = net.connect(socketPath);
+    probe.once('connect', () => {
+        probe.destroy();
+        resolve(false);
+    });
+    probe.once('error', (error) => resolve(error.code === 'ECONNREFUSED'));
+});
+
 async function startServer() {
     try {
         // Initialize database first
@@ -698,7 +858,7 @@ async function startServer() {
         // Then initialize compiler
         await compiler.ensureDirectories();
         
-        app.listen(PORT, () => {
+        const server = app.listen(PORT, () => {
             console.log(`🚀 KernelQ Server running on port ${PORT}`);
             console.log(`📁 Work directory: ${compiler.workDir}`);
             console.log(`⚡ Method: Direct host kernel compilation`);
@@ -706,6 +866,43 @@ async function startServer() {
             console.log(`💾 Database: SQLite with WAL mode`);
             console.log(`🎯 No Docker required!`);
         });
+
+        // Keep idle connections open between submissions (Node's default is 5s),
+        // so clients and the tunnel reuse them instead of reconnecting per request
+        server.keepAliveTimeout = 65000;
+        server.headersTimeout = 66000;
+
+        if (SOCKET_PATH) {
+            // Remove a stale socket left by a previous run (never any other kind of file, and never
+            // one another backend instance is still serving), then restrict it to owner and group
+            let socketInUse = false;
+            try {
+                if (fs.lstatSync(SOCKET_PATH, { throwIfNoEntry: false })?.isSocket()) {
+                    if (await isStaleSocket(SOCKET_PATH)) {
+                        fs.unlinkSync(SOCKET_PATH);
+                    } else {
+                        socketInUse = true;
+                    }
+                }
+            } catch (error) {
+                console.error(`⚠️ Could not check for a stale socket at ${SOCKET_PATH}:`, error.message);
+            }
+
+            if (socketInUse) {
+                console.error(`❌ Unix socket ${SOCKET_PATH} is held by another running instance, serving TCP only`);
+            } else {
+                const socketServer = app.listen(SOCKET_PATH, () => {
+                    fs.chmodSync(SOCKET_PATH, 0o660);
+                    console.log(`🔌 Also listening on Unix socket ${SOCKET_PATH}`);
+                });
+                // An unusable socket path must not take the TCP listener down with it
+                socketServer.on('error', (error) => {
+                    console.error(`❌ Unix socket ${SOCKET_PATH} unavailable, serving TCP only:`, error.message);
+                });
+                socketServer.keepAliveTimeout = server.keepAliveTimeout;
+                socketServer.headersTimeout = server.headersTimeout;
+            }
+        }
         
     } catch (error) {
         console.error('❌ Server startup failed:', error);
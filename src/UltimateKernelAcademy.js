@@ -36,6 +36,22 @@ const deepCopyFiles = (files) => {
     }));
 };
 
+// Frontend fetch timeout per problem, built once: the backend's QEMU scenario timeout plus a 10s buffer
+const DEFAULT_BACKEND_TIMEOUT = 30000;
+const BACKEND_TIMEOUTS = new Map(
+    generatedProblems.flatMap(problem => {
+        const projectTest = problem.validation?.testCases?.find(tc => tc.type === 'kernel_project_test');
+        const scenarioTimeout = projectTest?.testScenario?.timeout;
+        return scenarioTimeout ? [[problem.id, (scenarioTimeout + 10) * 1000]] : [];
+    })
+);
+
+// A dropped connection is retried once, but only while enough of the budget is left for a QEMU run.
+// The short pause gives a restarting backend a moment to come back before the retry.
+const VALIDATION_MAX_ATTEMPTS = 2;
+const VALIDATION_MIN_RETRY_BUDGET = 5000;
+const VALIDATION_RETRY_DELAY = 1000;
+
 
 // Problem Bank Tab Component
 
@@ -176,27 +192,14 @@ const UnlimitedKernelAcademy = () => {
         try {
             console.log('🚀 Making API call to:', `${BACKEND_URL}/validate-solution-comprehensive`);
 
-            // Find the problem definition from the generated problem bank
+            // Problems with a QEMU scenario timeout get that plus a buffer, others the default
             const numericProblemId = typeof problemId === 'string' ? parseInt(problemId) : problemId;
-            const testDef = generatedProblems.find(p => p.id === numericProblemId || p.id === problemId);
-
-            // Default frontend timeout (e.g., 30 seconds)
-            let backendTimeout = 30000;
-            console.log(`🔍 Frontend timeout lookup for problem: ${problemId}`);
-
-            // If a test scenario with a specific timeout exists, use it
-            if (testDef && testDef.validation?.testCases) {
-                const projectTest = testDef.validation.testCases.find(tc => tc.type === 'kernel_project_test');
-                if (projectTest && projectTest.testScenario?.timeout) {
-                    const scenarioTimeout = projectTest.testScenario.timeout;
-                    console.log(`📊 Problem ${problemId} backend requires ${scenarioTimeout}s. Setting frontend timeout with a buffer.`);
-                    backendTimeout = (scenarioTimeout + 10) * 1000;
-                }
-            }
+            const backendTimeout = BACKEND_TIMEOUTS.get(numericProblemId) ?? DEFAULT_BACKEND_TIMEOUT;
 
             console.log(`⏱️ Final frontend timeout set to: ${backendTimeout / 1000}s`);
 
-            // Use AbortController for fetch timeout
+            // Use AbortController for fetch timeout; retries share the same overall budget
+            const deadline = performance.now() + backendTimeout;
             const controller = new AbortController();
             const timeoutId = setTimeout(() => {
                 console.error(`❌ Frontend fetch timed out after ${backendTimeout / 1000}s`);
@@ -220,55 +223,85 @@ const UnlimitedKernelAcademy = () => {
                 console.log(`📄 Single-file submission`);
             }
 
-            const response = await fetch(`${BACKEND_URL}/validate-solution-comprehensive`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(requestBody),
-                signal: controller.signal
-            });
+            const body = JSON.stringify(requestBody);
+            let response;
 
-            clearTimeout(timeoutId);
+            try {
+                for (let attempt = 1; ; attempt++) {
+                    try {
+                        response = await fetch(`${BACKEND_URL}/validate-solution-comprehensive`, {
+                            method: 'POST',
+                            headers: {
+                                'Content-Type': 'application/json',
+                                // Lets the backend stop QEMU once we have given up waiting
+                                'X-Request-Timeout': String(Math.round(deadline - performance.now()))
+                            },
+                            body,
+                            signal: controller.signal
+                        });
+                        break;
+                    } catch (fetchError) {
+                        // Only connection failures are retried; an abort means the budget is spent.
+                        // HTTP errors (including 504) arrive as responses and are never retried.
+                        const remaining = deadline - performance.now();
+                        if (fetchError.name === 'AbortError' ||
+                            attempt >= VALIDATION_MAX_ATTEMPTS ||
+                            remaining < VALIDATION_MIN_RETRY_BUDGET) {
+                            throw fetchError;
+                        }
+                        // Wait before retrying, but never eat into the minimum budget the retry needs
+                        const retryDelay = Math.round(Math.min(VALIDATION_RETRY_DELAY, remaining - VALIDATION_MIN_RETRY_BUDGET));
+                        console.warn(`⚠️ Validation request failed (${fetchError.message}), retrying in ${retryDelay}ms with ${Math.round(remaining / 1000)}s left`);
+                        await new Promise(resolve => setTimeout(resolve, retryDelay));
+                    }
+                }
+            } finally {
+                clearTimeout(timeoutId);
+            }
 
             if (response.ok || response.status === 400) {
-                const result = await response.json();
-                console.log('✅ Backend response received:', { success: result.success, overallResult: result.overallResult, score: result.score });
+                // Read the body once and keep it, so a non-JSON reply (e.g. a proxy error page) can be reported
+                const raw = await response.text();
+                let result;
+                try {
+                    result = JSON.parse(raw);
+                } catch (parseError) {
+                    throw new Error(`Backend returned invalid JSON (HTTP ${response.status}): ${raw.slice(0, 200)}`);
+                }
+                const { overallResult, score, testResults, feedback } = result;
+                console.log('✅ Backend response received:', { success: result.success, overallResult, score });
+
+                const passedTests = testResults?.filter(t => t.status === 'PASSED').length || 0;
+                const mappedTests = testResults?.map(test => ({
+                    testName: test.name || test.id,
+                    status: test.status,
+                    message: test.message || '',
+                    visible: true,
+                    executionTime: test.executionTime || 100
+                }));
 
-                if (result.success && result.overallResult === 'ACCEPTED') {
+                if (result.success && overallResult === 'ACCEPTED') {
                     return {
                         success: true,
-                        overallResult: result.overallResult,
-                        totalTests: result.testResults?.length || 0,
-                        passedTests: result.testResults?.filter(t => t.status === 'PASSED').length || 0,
-                        score: result.score,
-                        testResults: result.testResults?.map(test => ({
-                            testName: test.name || test.id,
-                            status: test.status,
-                            message: test.message || '',
-                            visible: true,
-                            executionTime: test.executionTime || 100
-                        })) || [],
+                        overallResult,
+                        totalTests: testResults?.length || 0,
+                        passedTests,
+                        score,
+                        testResults: mappedTests || [],
                         compilationResult: result.compilationResult,
                         testingResult: result.testingResult,
                         backendDetails: result,
                         realBackend: true,
-                        feedback: result.feedback
+                        feedback
                     };
                 } else {
                     return {
                         success: false,
-                        overallResult: result.overallResult || 'WRONG_ANSWER',
-                        totalTests: result.testResults?.length || 1,
-                        passedTests: result.testResults?.filter(t => t.status === 'PASSED').length || 0,
-                        score: result.score || 0,
-                        testResults: result.testResults?.map(test => ({
-                            testName: test.name || test.id,
-                            status: test.status,
-                            message: test.message || '',
-                            visible: true,
-                            executionTime: test.executionTime || 100
-                        })) || [{
+                        overallResult: overallResult || 'WRONG_ANSWER',
+                        totalTests: testResults?.length || 1,
+                        passedTests,
+                        score: score || 0,
+                        testResults: mappedTests || [{
                             testName: 'Validation',
                             status: 'WRONG_ANSWER',
                             message: result.error || 'Validation failed',
@@ -278,11 +311,11 @@ const UnlimitedKernelAcademy = () => {
                         compilationResult: result.compilationResult || { success: false, error: result.error },
                         realBackend: true,
                         backendDetails: result,
-                        feedback: result.feedback
+                        feedback
                     };
                 }
             } else {
-                throw new Error('Backend API call failed');
+                throw new Error(`Backend API call failed (HTTP ${response.status})`);
             }
         } catch (error) {
             console.error('LeetCode-style validation failed:', error);
@@ -3,6 +3,15 @@ import { Send, Trash2, StopCircle, Bot, User, AlertCircle, Lightbulb, Code, Refr
 import { PremiumStyles } from '../../styles/PremiumStyles';
 import useIsMobile from '../../hooks/useIsMobile';
 
+// Markdown patterns used while rendering tutor messages, compiled once
+// instead of on every render (streaming re-renders on each chunk)
+const THINK_BLOCK_RE = /<think>[\s\S]*?<\/think>/gi;
+const CODE_BLOCK_SPLIT_RE = /(```[\s\S]*?```)/g;
+const BOLD_RE = /^\*\*([\s\S]*?)\*\*/;
+const ITALIC_RE = /^\*([^*]+)\*/;
+const INLINE_CODE_RE = /^`([^`]+)`/;
+const NUMBERED_LIST_RE = /^(\d+)\.\s+(.+)$/;
+
 /**
  * AiTutorPanel - Socratic AI Tutor Chat Interface
  *
@@ -26,6 +35,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
         isLoading,
         error,
         streamingMessage,
+        isThinking,
         editingMessageId,
         sendMessage,
         clearHistory,
@@ -137,7 +147,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
     const stripThinkTags = (content) => {
         if (!content) return content;
         // Remove <think>...</think> blocks (including multiline)
-        return content.replace(/<think>[\s\S]*?<\/think>/gi, '').trim();
+        return content.replace(THINK_BLOCK_RE, '').trim();
     };
 
     // Render inline formatting (bold, italic, inline code)
@@ -151,7 +161,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
         // Process text character by character to handle nested formatting
         while (remaining.length > 0) {
             // Check for bold **...**
-            const boldMatch = remaining.match(/^\*\*([\s\S]*?)\*\*/);
+            const boldMatch = remaining.match(BOLD_RE);
             if (boldMatch) {
                 // Recursively render content inside bold (may contain inline code)
                 result.push(
@@ -165,7 +175,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
             }
 
             // Check for italic *...* (single asterisk, not double)
-            const italicMatch = remaining.match(/^\*([^*]+)\*/);
+            const italicMatch = remaining.match(ITALIC_RE);
             if (italicMatch) {
                 result.push(
                     <em key={`${keyPrefix}-italic-${idx}`}>
@@ -178,7 +188,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
             }
 
             // Check for inline code `...`
-            const codeMatch = remaining.match(/^`([^`]+)`/);
+            const codeMatch = remaining.match(INLINE_CODE_RE);
             if (codeMatch) {
                 result.push(
                     <code key={`${keyPrefix}-code-${idx}`} style={{
@@ -200,13 +210,11 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
             // Find next special character or end
             const nextBold = remaining.indexOf('**');
             const nextCode = remaining.indexOf('`');
-            // Find single asterisk that's not part of **
-            let nextItalic = -1;
-            for (let i = 0; i < remaining.length; i++) {
-                if (remaining[i] === '*' && remaining[i + 1] !== '*' && (i === 0 || remaining[i - 1] !== '*')) {
-                    nextItalic = i;
-                    break;
-                }
+            // Find single asterisk that's not part of ** (jump between '*' with indexOf)
+            let nextItalic = remaining.indexOf('*');
+            while (nextItalic !== -1 &&
+                   (remaining[nextItalic + 1] === '*' || (nextItalic > 0 && remaining[nextItalic - 1] === '*'))) {
+                nextItalic = remaining.indexOf('*', nextItalic + 1);
             }
             let nextSpecial = remaining.length;
 
@@ -238,7 +246,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
         if (!cleanContent) return null;
 
         // Split by code blocks first
-        const parts = cleanContent.split(/(```[\s\S]*?```)/g);
+        const parts = cleanContent.split(CODE_BLOCK_SPLIT_RE);
 
         return parts.map((part, idx) => {
             if (part.startsWith('```')) {
@@ -428,7 +436,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
                         }
 
                         // Numbered lists
-                        const numberedMatch = trimmedLine.match(/^(\d+)\.\s+(.+)$/);
+                        const numberedMatch = trimmedLine.match(NUMBERED_LIST_RE);
                         if (numberedMatch) {
                             return (
                                 <div key={lineIdx} style={{
@@ -957,10 +965,8 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
                 })}
 
                 {/* Streaming message */}
-                {streamingMessage && (() => {
-                    // Check if still in thinking mode (has <think> but no </think> yet)
-                    const isThinking = streamingMessage.includes('<think>') && !streamingMessage.includes('</think>');
-
+                {(streamingMessage || isThinking) && (() => {
+                    // Thinking state is tracked incrementally while streaming (see streamMessage)
                     if (isThinking) {
                         return (
                             <div style={{
@@ -1054,7 +1060,7 @@ const AiTutorPanel = ({ challenge, codeEditor, aiTutor, onSwitchToCode }) => {
                 })()}
 
                 {/* Loading indicator */}
-                {isLoading && !streamingMessage && (
+                {isLoading && !streamingMessage && !isThinking && (
                     <div style={{
                         display: 'flex',
                         gap: isMobile ? '8px' : '12px',
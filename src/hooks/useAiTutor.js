@@ -1,5 +1,43 @@
-import { useState, useCallback, useRef } from 'react';
-import { streamMessage, buildContextMessage } from '../services/aiTutorService';
+import { useState, useCallback, useMemo, useRef } from 'react';
+import { streamMessage, buildContextMessage, buildWorkspaceMessage } from '../services/aiTutorService';
+
+// Shared empty history so memoized views stay stable for problems without chat
+const EMPTY_HISTORY = [];
+
+/**
+ * Collect streamed chunks and publish the partial reply at most once per frame
+ *
+ * Re-rendering (and re-parsing the markdown of) the whole reply on every
+ * token is quadratic in reply length; chunks are kept in a list and joined
+ * only when a frame is painted and once more at the end.
+ */
+const createStreamCollector = (publish, signal) => {
+    const chunks = [];
+    let frame = null;
+
+    const flush = () => {
+        frame = null;
+        if (!signal?.aborted) {
+            publish(chunks.join(''));
+        }
+    };
+
+    return {
+        onChunk: (chunk) => {
+            chunks.push(chunk);
+            if (frame === null) {
+                frame = requestAnimationFrame(flush);
+            }
+        },
+        finish: () => {
+            if (frame !== null) {
+                cancelAnimationFrame(frame);
+                frame = null;
+            }
+            return chunks.join('');
+        }
+    };
+};
 
 /**
  * useAiTutor - Hook for Socratic AI Tutor functionality
@@ -30,23 +68,25 @@ const useAiTutor = (challenge, codeEditor) => {
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState(null);
     const [streamingMessage, setStreamingMessage] = useState('');
+    const [isThinking, setIsThinking] = useState(false);
     const [editingMessageId, setEditingMessageId] = useState(null);
     const abortControllerRef = useRef(null);
     const messageIdCounter = useRef(0);
 
     // Get current problem's chat history
     const problemId = challenge?.id;
-    const rawChatHistory = chatHistories[problemId] || [];
+    const rawChatHistory = chatHistories[problemId] || EMPTY_HISTORY;
 
     // Convert internal format to display format (using active versions)
-    const chatHistory = rawChatHistory.map(msg => ({
+    // Memoized: streaming re-renders on every chunk but the history is unchanged
+    const chatHistory = useMemo(() => rawChatHistory.map(msg => ({
         id: msg.id,
         role: msg.role,
         content: msg.versions[msg.activeVersion]?.content || '',
         timestamp: msg.versions[msg.activeVersion]?.timestamp || Date.now(),
         versionCount: msg.versions.length,
         activeVersion: msg.activeVersion,
-    }));
+    })), [rawChatHistory]);
 
     /**
      * Generate unique message ID
@@ -78,9 +118,10 @@ const useAiTutor = (challenge, codeEditor) => {
     }, [problemId, generateMessageId]);
 
     /**
-     * Build the full context for the AI including problem info, code, and errors
+     * Static problem context used as the system message
+     * Rendered once per challenge instead of on every send.
      */
-    const buildFullContext = useCallback(() => {
+    const problemContext = useMemo(() => {
         if (!challenge) return '';
 
         // Extract VISUAL_GUIDE.md content if available
@@ -90,6 +131,20 @@ const useAiTutor = (challenge, codeEditor) => {
         const functionNames = challenge.validation?.exactRequirements?.functionNames || [];
         const outputMessages = challenge.validation?.exactRequirements?.outputMessages?.slice(0, 8) || [];
 
+        return buildContextMessage({
+            title: challenge.title,
+            description: challenge.description,
+            visualGuide,
+            functionNames,
+            outputMessages,
+            concepts: challenge.concepts || []
+        });
+    }, [challenge]);
+
+    /**
+     * Build the workspace snapshot (code, errors, failed tests) for the latest turn
+     */
+    const buildWorkspaceContext = useCallback(() => {
         // Get current code from all editable files
         const currentCode = codeEditor?.files
             ?.filter(f => !f.readOnly)
@@ -102,18 +157,30 @@ const useAiTutor = (challenge, codeEditor) => {
                         lastOutput.toLowerCase().includes('fail') ||
                         lastOutput.includes('FAIL:');
 
-        return buildContextMessage({
-            title: challenge.title,
-            description: challenge.description,
-            visualGuide,
-            functionNames,
-            outputMessages,
-            concepts: challenge.concepts || [],
+        return buildWorkspaceMessage({
             currentCode,
             lastOutput: hasError ? lastOutput : '',
             testResults: codeEditor?.testResults || []
         });
-    }, [challenge, codeEditor]);
+    }, [codeEditor]);
+
+    /**
+     * Build the messages for the API call
+     * Static problem context stays first and unchanged between turns (cacheable
+     * prefix); the workspace snapshot rides along with the newest user message.
+     */
+    const buildMessagesForApi = useCallback((history, userContent) => {
+        const workspace = buildWorkspaceContext();
+
+        return [
+            { role: 'system', content: problemContext },
+            ...history.map(m => ({
+                role: m.role,
+                content: m.versions[m.activeVersion]?.content || ''
+            })),
+            { role: 'user', content: workspace + userContent }
+        ];
+    }, [problemContext, buildWorkspaceContext]);
 
     /**
      * Edit a user message and create a new branch
@@ -183,28 +250,20 @@ const useAiTutor = (challenge, codeEditor) => {
         setStreamingMessage('');
 
         try {
-            const contextMessage = buildFullContext();
             // Build messages for API using only active versions up to edited message
-            const messagesForApi = [
-                { role: 'system', content: contextMessage },
-                ...truncatedHistory.slice(0, -1).map(m => ({
-                    role: m.role,
-                    content: m.versions[m.activeVersion]?.content || ''
-                })),
-                { role: 'user', content: newContent }
-            ];
+            const messagesForApi = buildMessagesForApi(truncatedHistory.slice(0, -1), newContent);
 
-            let fullResponse = '';
+            const stream = createStreamCollector(setStreamingMessage, abortControllerRef.current.signal);
 
             await streamMessage(
                 messagesForApi,
-                (chunk) => {
-                    fullResponse += chunk;
-                    setStreamingMessage(fullResponse);
-                },
-                abortControllerRef.current.signal
+                stream.onChunk,
+                abortControllerRef.current.signal,
+                { onThinking: setIsThinking }
             );
 
+            const fullResponse = stream.finish();
+
             // Add AI response as new message
             const aiMessage = {
                 id: generateMessageId(),
@@ -224,9 +283,10 @@ const useAiTutor = (challenge, codeEditor) => {
             setError(errorMsg);
         } finally {
             setIsLoading(false);
+            setIsThinking(false);
             abortControllerRef.current = null;
         }
-    }, [problemId, chatHistories, generateMessageId, buildFullContext]);
+    }, [problemId, chatHistories, generateMessageId, buildMessagesForApi]);
 
     /**
      * Navigate to a different version of a message (branch navigation)
@@ -327,31 +387,23 @@ const useAiTutor = (challenge, codeEditor) => {
         // Build messages for API BEFORE adding to history (avoids stale closure)
         // Use rawChatHistory to get current state directly
         const currentHistory = chatHistories[problemId] || [];
-        const contextMessage = buildFullContext();
-        const messagesForApi = [
-            { role: 'system', content: contextMessage },
-            ...currentHistory.map(m => ({
-                role: m.role,
-                content: m.versions[m.activeVersion]?.content || ''
-            })),
-            { role: 'user', content: userMessage }
-        ];
+        const messagesForApi = buildMessagesForApi(currentHistory, userMessage);
 
         // Now add user message to history
         addMessage('user', userMessage);
 
         try {
-            let fullResponse = '';
+            const stream = createStreamCollector(setStreamingMessage, abortControllerRef.current.signal);
 
             await streamMessage(
                 messagesForApi,
-                (chunk) => {
-                    fullResponse += chunk;
-                    setStreamingMessage(fullResponse);
-                },
-                abortControllerRef.current.signal
+                stream.onChunk,
+                abortControllerRef.current.signal,
+                { onThinking: setIsThinking }
             );
 
+            const fullResponse = stream.finish();
+
             // Add complete response to history
             addMessage('assistant', fullResponse);
             setStreamingMessage('');
@@ -365,9 +417,10 @@ const useAiTutor = (challenge, codeEditor) => {
             // Don't add error as assistant message - just show in error state
         } finally {
             setIsLoading(false);
+            setIsThinking(false);
             abortControllerRef.current = null;
         }
-    }, [problemId, chatHistories, buildFullContext, addMessage]);
+    }, [problemId, chatHistories, buildMessagesForApi, addMessage]);
 
     /**
      * Clear chat history for current problem
@@ -391,6 +444,7 @@ const useAiTutor = (challenge, codeEditor) => {
             abortControllerRef.current.abort();
             abortControllerRef.current = null;
             setIsLoading(false);
+            setIsThinking(false);
             setStreamingMessage('');
         }
     }, []);
@@ -459,27 +513,19 @@ const useAiTutor = (challenge, codeEditor) => {
         setStreamingMessage('');
 
         try {
-            const contextMessage = buildFullContext();
-            const messages = [
-                { role: 'system', content: contextMessage },
-                ...trimmedHistory.map(m => ({
-                    role: m.role,
-                    content: m.versions[m.activeVersion]?.content || ''
-                })),
-                { role: 'user', content: lastUserContent }
-            ];
+            const messages = buildMessagesForApi(trimmedHistory, lastUserContent);
 
-            let fullResponse = '';
+            const stream = createStreamCollector(setStreamingMessage, abortControllerRef.current.signal);
 
             await streamMessage(
                 messages,
-                (chunk) => {
-                    fullResponse += chunk;
-                    setStreamingMessage(fullResponse);
-                },
-                abortControllerRef.current.signal
+                stream.onChunk,
+                abortControllerRef.current.signal,
+                { onThinking: setIsThinking }
             );
 
+            const fullResponse = stream.finish();
+
             // Add complete response to history
             const aiMessage = {
                 id: generateMessageId(),
@@ -501,9 +547,10 @@ const useAiTutor = (challenge, codeEditor) => {
             setError(errorMsg);
         } finally {
             setIsLoading(false);
+            setIsThinking(false);
             abortControllerRef.current = null;
         }
-    }, [problemId, chatHistories, buildFullContext, generateMessageId]);
+    }, [problemId, chatHistories, buildMessagesForApi, generateMessageId]);
 
     return {
         // State
@@ -511,6 +558,7 @@ const useAiTutor = (challenge, codeEditor) => {
         isLoading,
         error,
         streamingMessage,
+        isThinking,
         editingMessageId,
 
         // Actions
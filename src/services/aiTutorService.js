@@ -8,6 +8,37 @@
 // API endpoint - configurable via environment variable
 const AI_TUTOR_URL = process.env.REACT_APP_AI_TUTOR_URL || 'https://ai-api.kernelq.com';
 
+// Per-chunk stream diagnostics - off unless explicitly enabled
+const AI_TUTOR_DEBUG = process.env.REACT_APP_AI_TUTOR_DEBUG === 'true';
+
+// Authorization header built once; a key pasted with its own "Bearer " prefix is normalized
+const AI_TUTOR_KEY = (process.env.REACT_APP_AI_TUTOR_API_KEY || '').replace(/^(?:bearer\s+)+/i, '').trim();
+const AI_TUTOR_AUTH = `Bearer ${AI_TUTOR_KEY}`;
+
+/**
+ * Open the TCP+TLS connection to the tutor proxy ahead of the first message.
+ * The browser keeps it in its pool, so later requests skip the handshake too.
+ */
+const preconnectTutor = () => {
+    if (typeof document === 'undefined') return;
+
+    try {
+        const origin = new URL(AI_TUTOR_URL).origin;
+        if (document.head.querySelector(`link[rel="preconnect"][href="${origin}"]`)) return;
+
+        const link = document.createElement('link');
+        link.rel = 'preconnect';
+        link.href = origin;
+        // fetch() without credentials uses the anonymous connection pool
+        link.crossOrigin = 'anonymous';
+        document.head.appendChild(link);
+    } catch (e) {
+        // Relative or malformed URL - nothing to preconnect to
+    }
+};
+
+preconnectTutor();
+
 // Socratic C Programming Tutor System Prompt
 const SOCRATIC_SYSTEM_PROMPT = `You are a hands-on technical educator who teaches C programming and systems concepts through concrete, executable understanding. Your style is Socratic — you guide discovery, NEVER give direct code solutions.
 
@@ -85,6 +116,9 @@ If they're pattern-matching without understanding:
 
 /**
  * Build the context message that provides problem-specific information
+ *
+ * Only static problem data goes here so the system prompt is byte-identical
+ * on every turn and the upstream can serve it from its prefix cache.
  */
 export const buildContextMessage = ({
     title,
@@ -92,32 +126,29 @@ export const buildContextMessage = ({
     visualGuide,
     functionNames,
     outputMessages,
-    concepts,
-    currentCode,
-    lastOutput,
-    testResults
+    concepts
 }) => {
-    let context = "";
+    const parts = [];
 
-    context += `\n\n---\n\n## CURRENT PROBLEM CONTEXT\n`;
-    context += `\n**Problem:** ${title}\n`;
-    context += `\n**Description:** ${description}\n`;
+    parts.push(`\n\n---\n\n## CURRENT PROBLEM CONTEXT\n`);
+    parts.push(`\n**Problem:** ${title}\n`);
+    parts.push(`\n**Description:** ${description}\n`);
 
     if (concepts && concepts.length > 0) {
-        context += `\n**Key Concepts:** ${concepts.join(', ')}\n`;
+        parts.push(`\n**Key Concepts:** ${concepts.join(', ')}\n`);
     }
 
     if (functionNames && functionNames.length > 0) {
-        context += `\n**Functions to Implement:**\n`;
+        parts.push(`\n**Functions to Implement:**\n`);
         functionNames.forEach(fn => {
-            context += `- ${fn}()\n`;
+            parts.push(`- ${fn}()\n`);
         });
     }
 
     if (outputMessages && outputMessages.length > 0) {
-        context += `\n**Expected Outputs (first few):**\n`;
+        parts.push(`\n**Expected Outputs (first few):**\n`);
         outputMessages.slice(0, 5).forEach(msg => {
-            context += `- "${msg}"\n`;
+            parts.push(`- "${msg}"\n`);
         });
     }
 
@@ -126,30 +157,125 @@ export const buildContextMessage = ({
         const truncatedGuide = visualGuide.length > 4000
             ? visualGuide.substring(0, 4000) + '\n\n[... guide truncated ...]'
             : visualGuide;
-        context += `\n**Reference Material (VISUAL_GUIDE.md):**\n\`\`\`\n${truncatedGuide}\n\`\`\`\n`;
+        parts.push(`\n**Reference Material (VISUAL_GUIDE.md):**\n\`\`\`\n${truncatedGuide}\n\`\`\`\n`);
     }
 
+    parts.push(`\n---\n\nRemember: Guide them to discover, never give direct solutions. Use building blocks and Socratic questions.`);
+
+    return parts.join('');
+};
+
+/**
+ * Build the workspace snapshot (student code, last output, failed tests)
+ *
+ * This changes between turns, so it is sent with the latest user message
+ * at the end of the conversation instead of inside the system prompt.
+ */
+export const buildWorkspaceMessage = ({
+    currentCode,
+    lastOutput,
+    testResults
+}) => {
+    const parts = [];
+
     if (currentCode) {
-        context += `\n**Student's Current Code:**\n\`\`\`c\n${currentCode}\n\`\`\`\n`;
+        parts.push(`\n**Student's Current Code:**\n\`\`\`c\n${currentCode}\n\`\`\`\n`);
     }
 
     if (lastOutput) {
-        context += `\n**Last Run Output/Error:**\n\`\`\`\n${lastOutput}\n\`\`\`\n`;
+        parts.push(`\n**Last Run Output/Error:**\n\`\`\`\n${lastOutput}\n\`\`\`\n`);
     }
 
     if (testResults && testResults.length > 0) {
         const failedTests = testResults.filter(t => !t.passed);
         if (failedTests.length > 0) {
-            context += `\n**Failed Tests:**\n`;
+            parts.push(`\n**Failed Tests:**\n`);
             failedTests.forEach(t => {
-                context += `- ${t.name}: ${t.message || 'Failed'}\n`;
+                parts.push(`- ${t.name}: ${t.message || 'Failed'}\n`);
             });
         }
     }
 
-    context += `\n---\n\nRemember: Guide them to discover, never give direct solutions. Use building blocks and Socratic questions.`;
+    if (parts.length === 0) return '';
 
-    return context;
+    return `## CURRENT WORKSPACE\n${parts.join('')}\n---\n\n`;
+};
+
+const THINK_OPEN = '<think>';
+const THINK_CLOSE = '</think>';
+
+/**
+ * Incremental splitter for Qwen3 <think>...</think> blocks in streamed deltas
+ *
+ * Keeps the in/out state between chunks and only holds back a tail short
+ * enough to be a split marker, so each character is looked at once instead
+ * of re-scanning the whole accumulated reply on every chunk.
+ */
+const createThinkFilter = () => {
+    let inThink = false;
+    let pending = '';
+
+    const push = (delta) => {
+        let text = pending + delta;
+        let visible = '';
+        pending = '';
+
+        while (text) {
+            const marker = inThink ? THINK_CLOSE : THINK_OPEN;
+            const idx = text.indexOf(marker);
+
+            if (idx !== -1) {
+                if (!inThink) visible += text.slice(0, idx);
+                text = text.slice(idx + marker.length);
+                inThink = !inThink;
+                continue;
+            }
+
+            // Hold back a tail that could be the start of a marker split across chunks
+            let keep = Math.min(marker.length - 1, text.length);
+            while (keep > 0 && !marker.startsWith(text.slice(-keep))) keep--;
+
+            if (!inThink) visible += text.slice(0, text.length - keep);
+            pending = text.slice(text.length - keep);
+            break;
+        }
+
+        return { visible, inThink };
+    };
+
+    // Release whatever was held back once the stream ends
+    const flush = () => {
+        const rest = inThink ? '' : pending;
+        pending = '';
+        return rest;
+    };
+
+    return { push, flush };
+};
+
+/**
+ * POST a chat completion body to the Socratic endpoint
+ *
+ * Shared by sendMessage and streamMessage; throws with the proxy's error
+ * message (or the HTTP status) when the response is not ok.
+ */
+const postSocratic = async (body, signal) => {
+    const response = await fetch(`${AI_TUTOR_URL}/socratic`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Authorization': AI_TUTOR_AUTH
+        },
+        body: JSON.stringify(body),
+        signal
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error?.message || `HTTP ${response.status}`);
+    }
+
+    return response;
 };
 
 /**
@@ -163,26 +289,14 @@ export const sendMessage = async (messages, options = {}) => {
     } = options;
 
     try {
-        const response = await fetch(`${AI_TUTOR_URL}/socratic`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'Authorization': `Bearer ${process.env.REACT_APP_AI_TUTOR_API_KEY || ''}`
-            },
-            body: JSON.stringify({
-                model,
-                messages,
-                max_tokens: maxTokens,
-                temperature,
-                stream: false
-            })
+        const response = await postSocratic({
+            model,
+            messages,
+            max_tokens: maxTokens,
+            temperature,
+            stream: false
         });
 
-        if (!response.ok) {
-            const errorData = await response.json().catch(() => ({}));
-            throw new Error(errorData.error?.message || `HTTP ${response.status}`);
-        }
-
         const data = await response.json();
 
         if (data.error) {
@@ -205,71 +319,93 @@ export const sendMessage = async (messages, options = {}) => {
 
 /**
  * Send a message with streaming response
+ *
+ * onChunk only receives visible answer text; thinking blocks are filtered
+ * out while streaming and reported through options.onThinking(true/false).
  */
 export const streamMessage = async (messages, onChunk, signal, options = {}) => {
     const {
         model = 'Qwen-Qwen3-30B-A3B',
         maxTokens = 2048,
-        temperature = 0.6
+        temperature = 0.6,
+        onThinking
     } = options;
 
-    const response = await fetch(`${AI_TUTOR_URL}/socratic`, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${process.env.REACT_APP_AI_TUTOR_API_KEY || ''}`
-        },
-        body: JSON.stringify({
-            model,
-            messages,
-            max_tokens: maxTokens,
-            temperature,
-            stream: true
-        }),
-        signal
-    });
+    const response = await postSocratic({
+        model,
+        messages,
+        max_tokens: maxTokens,
+        temperature,
+        stream: true
+    }, signal);
+
+    // Decode UTF-8 inside the stream pipeline so reads already yield strings
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    const thinkFilter = createThinkFilter();
+    let thinking = false;
+    let buffer = '';
 
-    if (!response.ok) {
-        const errorData = await response.json().catch(() => ({}));
-        throw new Error(errorData.error?.message || `HTTP ${response.status}`);
-    }
+    const emit = (content) => {
+        const { visible, inThink } = thinkFilter.push(content);
+        if (inThink !== thinking) {
+            thinking = inThink;
+            if (onThinking) onThinking(inThink);
+        }
+        if (visible) {
+            onChunk(visible);
+        }
+    };
 
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-    let buffer = '';
+    const finish = () => {
+        const rest = thinkFilter.flush();
+        if (rest) {
+            onChunk(rest);
+        }
+    };
 
     try {
         while (true) {
             const { done, value } = await reader.read();
 
-            if (done) break;
+            if (done) {
+                finish();
+                break;
+            }
 
-            buffer += decoder.decode(value, { stream: true });
+            buffer += value;
 
-            // Process complete SSE messages
-            const lines = buffer.split('\n');
-            buffer = lines.pop() || ''; // Keep incomplete line in buffer
+            // Process complete SSE lines in place; only the unterminated tail is kept
+            let start = 0;
+            let newline;
 
-            for (const line of lines) {
-                if (line.startsWith('data: ')) {
-                    const data = line.slice(6);
+            while ((newline = buffer.indexOf('\n', start)) !== -1) {
+                const lineStart = start;
+                start = newline + 1;
 
-                    if (data === '[DONE]') {
-                        return;
-                    }
+                if (!buffer.startsWith('data: ', lineStart)) continue;
 
-                    try {
-                        const parsed = JSON.parse(data);
-                        const content = parsed.choices?.[0]?.delta?.content || '';
-                        if (content) {
-                            onChunk(content);
-                        }
-                    } catch (e) {
-                        // Skip malformed JSON
-                        console.warn('Failed to parse SSE chunk:', data);
+                const data = buffer.slice(lineStart + 6, newline);
+
+                if (data === '[DONE]') {
+                    finish();
+                    return;
+                }
+
+                try {
+                    const parsed = JSON.parse(data);
+                    const content = parsed.choices?.[0]?.delta?.content || '';
+                    if (content) {
+                        emit(content);
+                    }
+                } catch (e) {
+                    // Skip malformed JSON
+                    if (AI_TUTOR_DEBUG) {
+                        console.warn('Failed to parse SSE chunk:', data.slice(0, 200));
                     }
                 }
             }
+
+            buffer = buffer.slice(start);
         }
     } finally {
         reader.releaseLock();
@@ -305,6 +441,7 @@ export default {
     sendMessage,
     streamMessage,
     buildContextMessage,
+    buildWorkspaceMessage,
     checkHealth,
     AI_TUTOR_URL
 };